@@ -8,25 +8,33 @@ Telegram Task Management Bot (Clean Rewrite)
 - After YES, no further reminders for that task/user, ever.
 """
 import os
-import sqlite3
+import re
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from time import monotonic
+from datetime import datetime, time as dt_time, timedelta, timezone
 from typing import List
-import pytz
+from zoneinfo import ZoneInfo
+import aiosqlite
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler, ContextTypes, filters, MessageHandler
+    AIORateLimiter, Application, CommandHandler, CallbackQueryHandler, ContextTypes
 )
 
 # --- CONFIG ---
 DB_PATH = "tasks.db"
 REMINDER_INTERVAL = 120  # seconds (2 minutes)
 MAX_REMINDERS = 30
+MAX_SEND_RETRIES = 3  # re-sends after a 429, each waiting out Telegram's retry_after
+MAX_MESSAGE_LENGTH = 4000  # Telegram rejects messages over 4096 characters
+USER_TRACK_INTERVAL = 60  # seconds between users-table writes for an unchanged user
 
 # --- TIMEZONE SETUP ---
-PST = pytz.timezone('America/Los_Angeles')  # This handles PST/PDT automatically
-UTC = pytz.timezone('UTC')
+PST = ZoneInfo('America/Los_Angeles')  # This handles PST/PDT automatically
+UTC = timezone.utc
 
 def get_pst_now():
     """Get current time in PST/PDT"""
@@ -55,14 +63,122 @@ def pst_to_utc(pst_time):
 def utc_to_pst(utc_time):
     """Convert UTC time to PST for display"""
     if isinstance(utc_time, str):
-        utc_dt = UTC.localize(datetime.fromisoformat(utc_time.replace('Z', '')))
-    else:
-        if utc_time.tzinfo is None:
-            utc_dt = UTC.localize(utc_time)
-        else:
-            utc_dt = utc_time
+        utc_time = datetime.fromisoformat(utc_time.replace('Z', ''))
+    if utc_time.tzinfo is None:
+        utc_time = utc_time.replace(tzinfo=UTC)
     
-    return utc_dt.astimezone(PST)
+    return utc_time.astimezone(PST)
+
+TIME_RE = re.compile(r'(\d{1,2}):(\d{1,2})', re.ASCII)
+
+def parse_time(time_str):
+    """Validate a 24-hour HH:MM string and return it zero-padded, or None"""
+    m = TIME_RE.fullmatch(time_str)
+    if not m:
+        return None
+    hour, minute = int(m.group(1)), int(m.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+CALLBACK_RESPONSES = {'y': 'yes', 'n': 'no'}
+
+def parse_callback_data(data):
+    """Decode reminder button data ("t<task_id>y" / "t<task_id>n").
+
+    Returns (task_id, response), or None if the data isn't a task response.
+    Raises ValueError for a malformed task id.
+    """
+    if data.startswith("task_"):
+        # Legacy "task_<id>_yes|no" buttons still sitting in users' chats
+        task_id, _, response = data[5:].partition('_')
+        return int(task_id), response
+    if data[0] == 't' and data[-1] in CALLBACK_RESPONSES:
+        return int(data[1:-1]), CALLBACK_RESPONSES[data[-1]]
+    return None
+
+# Static replies for /start and /help
+WELCOME_TEXT = (
+    "Welcome! Admins can create tasks with /createtask @username description time frequency (e.g. /createtask @john Take out trash 14:00 daily).\n\n"
+    "Commands:\n"
+    "/createtask - Create a new task\n"
+    "/tasks - List all tasks\n"
+    "/removetask - Remove a task\n"
+    "/debug - Show debug info (admin only)\n"
+    "/test - Test reminders (admin only)\n"
+    "/testtask - Create a test task (admin only)\n"
+    "/time - Show current PST time\n\n"
+    "⏰ All times are in PST (Pacific Time)\n\n"
+    "💡 **Tip:** I'll send task reminders privately to you. Task completions will be announced in the group."
+)
+HELP_TEXT = """📋 **Task Management Bot Help**
+
+**📝 Creating Tasks:**
+• `/createtask @username description time frequency`
+• Example: `/createtask @john Clean office 09:00 daily`
+• Example: `/createtask @jane Submit report 17:30 once`
+
+**⏰ Time & Frequency:**
+• Time format: 24-hour PST (09:00, 17:30, 23:45)
+• Frequency: `once` (one-time) or `daily` (repeats daily)
+• All times are in Pacific Time (PST/PDT)
+
+**📋 Managing Tasks:**
+• `/tasks` - View all active tasks with their IDs
+• `/removetask 5` - Remove task with ID 5
+• `/time` - Show current PST time
+
+**🔔 Task Responses:**
+When you get a task reminder:
+• ✅ **YES** - Task completed (stops all reminders)
+• ❌ **NO** - Task not completed (reminds again in 2 minutes)
+
+**👥 How Reminders Work:**
+• **Private reminders** sent to you via DM
+• **Group announcements** when tasks are completed
+• Automatic follow-ups every 2 minutes until completed
+• Maximum 30 reminders per task
+
+**🔧 Admin Commands:**
+• `/debug` - Show system status and tracked users
+• `/test` - Manually trigger reminder system
+• `/testtask @username` - Create test task for immediate testing
+
+**💡 Tips:**
+• Start a private chat with the bot to receive DM reminders
+• Only assigned users can respond to their tasks
+• Task completions are announced in the group
+• Use `/time` to see current PST time for scheduling
+
+**🆘 Need Help?**
+Contact your group administrators for task management assistance."""
+
+# Reminder texts are fixed apart from the task fields, so format prebuilt templates
+REMINDER_TEXT = "⏰ **Task Reminder**\n\nYou have a task due: {description}\n\nHave you completed it?"
+GROUP_REMINDER_TEXT = (
+    "⏰ **Private Task Reminder**\n\n@{username}, you have a task due: {description}\n\nHave you completed it?\n\n"
+    "💡 *I tried to send this privately, but couldn't reach you. Please start a chat with @{bot_username} to receive private reminders.*"
+)
+
+@lru_cache(maxsize=1024)
+def reminder_markup(task_id):
+    """YES/NO keyboard for a task's reminders (markups are immutable, so one is shared per task)"""
+    keyboard = [
+        [
+            InlineKeyboardButton("✅ YES", callback_data=f"t{task_id}y"),
+            InlineKeyboardButton("❌ NO", callback_data=f"t{task_id}n")
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+def join_capped(parts, limit=MAX_MESSAGE_LENGTH):
+    """Join message parts, dropping whole trailing parts that would exceed `limit`"""
+    total = 0
+    for i, part in enumerate(parts):
+        total += len(part)
+        if total > limit:
+            return "".join(parts[:i]) + "…(truncated)"
+    return "".join(parts)
 
 # --- LOGGING ---
 logging.basicConfig(
@@ -71,57 +187,221 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# --- SQL ---
+# Statements used from more than one place are kept here so each query is
+# written once and read in one spot.
+SQL_INSERT_TASK = '''
+    INSERT INTO tasks (chat_id, assignee_id, assignee_username, description, scheduled_time, frequency)
+    VALUES (?, ?, ?, ?, ?, ?)
+    RETURNING id
+'''
+SQL_SELECT_CHAT_TASKS = 'SELECT id, assignee_username, description, scheduled_time, frequency, is_done FROM tasks WHERE chat_id = ?'
+SQL_SELECT_TASK_FOR_RESPONSE = 'SELECT assignee_username, is_done, chat_id, description FROM tasks WHERE id = ?'
+SQL_SELECT_ACTIVE_TASKS = 'SELECT id, chat_id, assignee_id, assignee_username, description, scheduled_time, frequency FROM tasks WHERE is_done = 0'
+# Open tasks in a time window, each with its reminder state (NULLs if none yet)
+SQL_SELECT_DUE_TASKS = '''
+    SELECT t.id, t.chat_id, t.assignee_id, t.assignee_username, t.description, t.scheduled_time, t.frequency,
+           r.last_reminder, r.reminder_count
+    FROM tasks t LEFT JOIN reminders r ON r.task_id = t.id
+    WHERE t.is_done = 0 AND t.scheduled_time BETWEEN ? AND ?
+'''
+SQL_MARK_TASK_DONE = 'UPDATE tasks SET is_done = 1 WHERE id = ?'
+SQL_DELETE_TASK = 'DELETE FROM tasks WHERE id = ?'
+# No row if the task has been closed; NULL reminder fields if it has no reminder yet
+SQL_SELECT_OPEN_REMINDER = '''
+    SELECT t.chat_id, t.assignee_id, t.assignee_username, t.description, r.last_reminder, r.reminder_count
+    FROM tasks t LEFT JOIN reminders r ON r.task_id = t.id
+    WHERE t.id = ? AND t.is_done = 0
+'''
+SQL_SELECT_FOLLOW_UPS = '''
+    SELECT r.task_id, t.chat_id, t.assignee_id, t.assignee_username, t.description, r.reminder_count, r.last_reminder
+    FROM reminders r JOIN tasks t ON r.task_id = t.id
+    WHERE t.is_done = 0 AND r.reminder_count < ?
+'''
+SQL_SELECT_FOLLOW_UP = '''
+    SELECT t.chat_id, t.assignee_id, t.assignee_username, t.description, r.reminder_count, r.last_reminder
+    FROM reminders r JOIN tasks t ON r.task_id = t.id
+    WHERE r.task_id = ? AND t.is_done = 0 AND r.reminder_count < ?
+'''
+# One row per task: the first reminder inserts it, later ones bump it in place
+SQL_RECORD_REMINDER = '''
+    INSERT INTO reminders (task_id, reminder_count, last_reminder) VALUES (?, 1, ?)
+    ON CONFLICT(task_id) DO UPDATE SET
+        reminder_count = reminder_count + 1,
+        last_reminder = excluded.last_reminder
+'''
+SQL_RECORD_REMINDER_RETURNING = SQL_RECORD_REMINDER + '    RETURNING reminder_count\n'
+SQL_DELETE_REMINDERS = 'DELETE FROM reminders WHERE task_id = ?'
+SQL_UPSERT_USER = '''
+    INSERT INTO users (id, username, first_name, last_name, last_seen)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        username = excluded.username,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        last_seen = excluded.last_seen
+'''
+SQL_SELECT_USER_ID = 'SELECT id FROM users WHERE username = ?'
+
 # --- DATABASE ---
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            chat_id INTEGER NOT NULL,
-            assignee_id INTEGER NOT NULL,
-            assignee_username TEXT NOT NULL,
-            description TEXT NOT NULL,
-            scheduled_time TEXT NOT NULL,
-            frequency TEXT NOT NULL,
-            is_done INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS reminders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id INTEGER NOT NULL,
-            reminder_count INTEGER DEFAULT 0,
-            last_reminder TIMESTAMP,
-            FOREIGN KEY (task_id) REFERENCES tasks(id)
-        )
-    ''')
-    # Add users table to track user IDs by username
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            username TEXT NOT NULL,
-            first_name TEXT,
-            last_name TEXT,
-            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(id, username)
-        )
-    ''')
-    conn.commit()
-    conn.close()
+async def connect_db():
+    """Open the long-lived connection shared by all handlers.
+
+    aiosqlite runs SQLite on its own thread so queries never block the event loop.
+    """
+    # isolation_level=None: autocommit, multi-statement writes use explicit BEGIN/COMMIT
+    conn = await aiosqlite.connect(DB_PATH, isolation_level=None)
+    await conn.execute('PRAGMA synchronous=NORMAL')
+    await conn.execute('PRAGMA busy_timeout=5000')
+    await conn.execute('PRAGMA temp_store=MEMORY')
+    await conn.execute('PRAGMA cache_size=-20000')
+    # Reads are served straight from the mapped file instead of copied through read()
+    await conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
+SCHEMA_SQL = '''
+    -- WAL is persistent in the database file, so set it once here
+    PRAGMA journal_mode=WAL;
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id INTEGER NOT NULL,
+        assignee_id INTEGER NOT NULL,
+        assignee_username TEXT NOT NULL,
+        description TEXT NOT NULL,
+        scheduled_time TEXT NOT NULL,
+        frequency TEXT NOT NULL,
+        is_done INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    -- One row per task, keyed by task_id itself (the rowid), so lookups and
+    -- upserts walk a single B-tree
+    CREATE TABLE IF NOT EXISTS reminders (
+        task_id INTEGER PRIMARY KEY,
+        reminder_count INTEGER NOT NULL DEFAULT 0,
+        last_reminder INTEGER,  -- Unix epoch seconds (UTC)
+        FOREIGN KEY (task_id) REFERENCES tasks(id)
+    );
+    -- Add users table to track user IDs by username
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        first_name TEXT,
+        last_name TEXT,
+        last_seen INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))  -- Unix epoch seconds
+    );
+    -- Older databases stored last_reminder and last_seen as ISO datetime strings
+    UPDATE reminders SET last_reminder = CAST(strftime('%s', last_reminder) AS INTEGER) WHERE typeof(last_reminder) = 'text';
+    UPDATE users SET last_seen = CAST(strftime('%s', last_seen) AS INTEGER) WHERE typeof(last_seen) = 'text';
+    -- /tasks filters by chat
+    CREATE INDEX IF NOT EXISTS idx_tasks_chat ON tasks(chat_id);
+    -- Reminder delivery resolves the assignee's @username to a user ID
+    CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+    -- Completed tasks are kept forever; the sweep only ever reads the open ones
+    CREATE INDEX IF NOT EXISTS idx_tasks_open ON tasks(scheduled_time) WHERE is_done = 0;
+    COMMIT;
+'''
+
+# Older databases gave reminders a surrogate id (with possibly several rows per
+# task) and users a UNIQUE(id, username) index that id alone already implies;
+# rebuild both in the current layout, keeping the newest reminder row per task
+REBUILD_REMINDERS_SQL = '''
+    BEGIN;
+    CREATE TABLE reminders_new (
+        task_id INTEGER PRIMARY KEY,
+        reminder_count INTEGER NOT NULL DEFAULT 0,
+        last_reminder INTEGER,  -- Unix epoch seconds (UTC)
+        FOREIGN KEY (task_id) REFERENCES tasks(id)
+    );
+    INSERT INTO reminders_new (task_id, reminder_count, last_reminder)
+        SELECT task_id, COALESCE(reminder_count, 0), last_reminder FROM reminders
+        WHERE id IN (SELECT MAX(id) FROM reminders GROUP BY task_id);
+    DROP TABLE reminders;
+    ALTER TABLE reminders_new RENAME TO reminders;
+    COMMIT;
+'''
+REBUILD_USERS_SQL = '''
+    BEGIN;
+    CREATE TABLE users_new (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        first_name TEXT,
+        last_name TEXT,
+        last_seen INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))  -- Unix epoch seconds
+    );
+    INSERT INTO users_new (id, username, first_name, last_name, last_seen)
+        SELECT id, username, first_name, last_name, last_seen FROM users;
+    DROP TABLE users;
+    ALTER TABLE users_new RENAME TO users;
+    COMMIT;
+'''
+
+async def init_db(conn):
+    """Create or migrate the schema on the shared connection (runs once in post_init)"""
+    reminder_columns = {row[1] for row in await conn.execute_fetchall('PRAGMA table_info(reminders)')}
+    if 'id' in reminder_columns:
+        await conn.executescript(REBUILD_REMINDERS_SQL)
+    user_indexes = await conn.execute_fetchall('PRAGMA index_list(users)')
+    if any(origin == 'u' for _, _, _, origin, _ in user_indexes):
+        await conn.executescript(REBUILD_USERS_SQL)
+    # One executescript call sends the whole DDL batch to the DB thread at once
+    await conn.executescript(SCHEMA_SQL)
+    # Times used to be stored as typed ("9:00"); zero-pad them so they sort and
+    # range-compare as text
+    rows = await conn.execute_fetchall('SELECT id, scheduled_time FROM tasks WHERE length(scheduled_time) != 5')
+    fixed = [(t, task_id) for task_id, sched_time in rows if (t := parse_time(sched_time))]
+    if fixed:
+        await conn.executemany('UPDATE tasks SET scheduled_time = ? WHERE id = ?', fixed)
 
 # --- BOT CLASS ---
 class TaskBot:
     def __init__(self, token: str, admin_ids: List[int]):
         self.token = token
-        self.admin_ids = admin_ids
+        self.admin_ids = frozenset(admin_ids)  # O(1) membership for _is_admin
         self.application = None
-        init_db()
+        self._conn = None  # opened (and the schema created) in _post_init, on the bot's event loop
+        # Serializes writers on the shared connection (transactions may span awaits)
+        self._db_lock = asyncio.Lock()
+        # Write-through cache of the users table for reminder delivery:
+        # lowercase username -> user ID, and user ID -> username to drop renamed entries
+        self._user_ids = {}
+        self._usernames = {}
+        # user ID -> (username, first_name, last_name, monotonic time of the last write)
+        self._tracked = {}
 
     def _is_admin(self, user_id: int) -> bool:
         return user_id in self.admin_ids
 
+    @asynccontextmanager
+    async def _transaction(self):
+        """Hold the write lock and run a block of writes as one BEGIN IMMEDIATE ... COMMIT"""
+        async with self._db_lock:
+            await self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                await self._conn.execute('ROLLBACK')
+                raise
+            else:
+                await self._conn.execute('COMMIT')
+
+    async def _fetchone(self, db, sql, params=()):
+        # execute_fetchall is one trip to the DB thread and builds no Cursor wrapper
+        rows = await db.execute_fetchall(sql, params)
+        return rows[0] if rows else None
+
+    async def _post_init(self, application: Application):
+        self._conn = await connect_db()
+        await init_db(self._conn)
+        # Reminders are event-driven: every open task has its own daily job and
+        # every pending follow-up its own timer, so nothing polls the database
+        await self._restore_tasks(application.job_queue)
+        await self._restore_follow_ups(application.job_queue)
+
+    async def _post_shutdown(self, application: Application):
+        if self._conn is not None:
+            await self._conn.close()
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message:
             return
@@ -129,19 +409,7 @@ class TaskBot:
         # Track the user
         await self._track_user(update.effective_user)
         
-        await update.message.reply_text(
-            "Welcome! Admins can create tasks with /createtask @username description time frequency (e.g. /createtask @john Take out trash 14:00 daily).\n\n"
-            "Commands:\n"
-            "/createtask - Create a new task\n"
-            "/tasks - List all tasks\n"
-            "/removetask - Remove a task\n"
-            "/debug - Show debug info (admin only)\n"
-            "/test - Test reminders (admin only)\n"
-            "/testtask - Create a test task (admin only)\n"
-            "/time - Show current PST time\n\n"
-            "⏰ All times are in PST (Pacific Time)\n\n"
-            "💡 **Tip:** I'll send task reminders privately to you. Task completions will be announced in the group."
-        )
+        await update.message.reply_text(WELCOME_TEXT)
 
     async def debug(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message or not update.effective_user:
@@ -155,44 +423,38 @@ class TaskBot:
             await update.message.reply_text("❌ Only admins can use debug.")
             return
         
-        pst_now = get_pst_now()
         utc_now = get_utc_now()
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
+        pst_now = utc_now.astimezone(PST)
         # Get all tasks
-        c.execute('''SELECT id, chat_id, assignee_username, description, scheduled_time, frequency, is_done FROM tasks''')
-        tasks = c.fetchall()
+        tasks = await self._conn.execute_fetchall('''SELECT id, chat_id, assignee_username, description, scheduled_time, frequency, is_done FROM tasks''')
         
         # Get all reminders
-        c.execute('''SELECT task_id, reminder_count, last_reminder FROM reminders''')
-        reminders = c.fetchall()
+        reminders = await self._conn.execute_fetchall('''SELECT task_id, reminder_count, last_reminder FROM reminders''')
         
         # Get tracked users
-        c.execute('''SELECT username, id, first_name FROM users ORDER BY last_seen DESC LIMIT 10''')
-        users = c.fetchall()
-        
-        conn.close()
+        users = await self._conn.execute_fetchall('''SELECT username, id, first_name FROM users ORDER BY last_seen DESC LIMIT 10''')
         
-        msg = f"🐛 Debug Info\n\n"
-        msg += f"PST time: {pst_now.strftime('%Y-%m-%d %H:%M:%S %Z')}\n"
-        msg += f"UTC time: {utc_now.strftime('%Y-%m-%d %H:%M:%S %Z')}\n\n"
-        msg += f"Tasks ({len(tasks)}):\n"
+        parts = [
+            "🐛 Debug Info\n\n",
+            f"PST time: {pst_now.strftime('%Y-%m-%d %H:%M:%S %Z')}\n",
+            f"UTC time: {utc_now.strftime('%Y-%m-%d %H:%M:%S %Z')}\n\n",
+            f"Tasks ({len(tasks)}):\n",
+        ]
         for task in tasks:
             task_id, chat_id, username, desc, sched_time, freq, is_done = task
             status = "✅ Done" if is_done else "⏳ Pending"
-            msg += f"ID {task_id}: @{username} - {desc[:30]}...\n"
-            msg += f"  Time: {sched_time} PST ({freq}) - {status}\n"
+            parts.append(f"ID {task_id}: @{username} - {desc[:30]}...\n  Time: {sched_time} PST ({freq}) - {status}\n")
         
-        msg += f"\nReminders ({len(reminders)}):\n"
+        parts.append(f"\nReminders ({len(reminders)}):\n")
         for task_id, count, last_reminder in reminders:
-            msg += f"Task {task_id}: {count} reminders, last: {last_reminder}\n"
+            last = datetime.fromtimestamp(last_reminder, UTC) if last_reminder else None
+            parts.append(f"Task {task_id}: {count} reminders, last: {last}\n")
         
-        msg += f"\nTracked Users ({len(users)}):\n"
+        parts.append(f"\nTracked Users ({len(users)}):\n")
         for username, user_id, first_name in users:
-            msg += f"@{username} (ID: {user_id}, {first_name})\n"
+            parts.append(f"@{username} (ID: {user_id}, {first_name})\n")
         
-        await update.message.reply_text(msg)
+        await update.message.reply_text(join_capped(parts))
 
     async def test(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message or not update.effective_user:
@@ -238,16 +500,10 @@ class TaskBot:
         assignee_id = 0  # Placeholder - we'll mention by username instead
             
         # Save task (store the PST time string, conversion to UTC happens in reminder logic)
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO tasks (chat_id, assignee_id, assignee_username, description, scheduled_time, frequency)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (update.effective_chat.id, assignee_id, username, description, time_str, "once"))
-        task_id = c.lastrowid
-        conn.commit()
-        conn.close()
+        async with self._db_lock:
+            task_id, = await self._fetchone(self._conn, SQL_INSERT_TASK, (update.effective_chat.id, assignee_id, username, description, time_str, "once"))
         
+        self._schedule_task(context.job_queue, task_id, time_str)
         logger.info(f"Created test task {task_id} for @{username} at {time_str} PST")
         await update.message.reply_text(
             f"🧪 Test task created!\n\n"
@@ -266,8 +522,8 @@ class TaskBot:
         # Track the user
         await self._track_user(update.effective_user)
         
-        pst_now = get_pst_now()
         utc_now = get_utc_now()
+        pst_now = utc_now.astimezone(PST)
         await update.message.reply_text(
             f"⏰ Current Time\n\n"
             f"PST: {pst_now.strftime('%H:%M:%S %Z')}\n"
@@ -293,13 +549,11 @@ class TaskBot:
             await update.message.reply_text("❌ Usage: /createtask @username description time frequency\n⏰ Time should be in PST (e.g., 14:00)")
             return
         username = context.args[0].lstrip('@')
-        time_str = context.args[-2]
+        time_str = parse_time(context.args[-2])
         frequency = context.args[-1].lower()
         description = " ".join(context.args[1:-2])
         # Validate time
-        try:
-            datetime.strptime(time_str, "%H:%M")
-        except ValueError:
+        if time_str is None:
             await update.message.reply_text("❌ Time must be in HH:MM 24-hour format (PST).")
             return
         if frequency not in ["once", "daily"]:
@@ -311,15 +565,9 @@ class TaskBot:
         assignee_id = 0  # Placeholder - we'll mention by username instead
         
         # Save task
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO tasks (chat_id, assignee_id, assignee_username, description, scheduled_time, frequency)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (update.effective_chat.id, assignee_id, username, description, time_str, frequency))
-        task_id = c.lastrowid
-        conn.commit()
-        conn.close()
+        async with self._db_lock:
+            task_id, = await self._fetchone(self._conn, SQL_INSERT_TASK, (update.effective_chat.id, assignee_id, username, description, time_str, frequency))
+        self._schedule_task(context.job_queue, task_id, time_str)
         logger.info(f"Created task {task_id} for @{username} at {time_str} PST")
         await update.message.reply_text(f"✅ Task created for @{username}: {description} at {time_str} PST ({frequency})\nTask ID: {task_id}\n\n💡 **Note:** Reminders will be sent privately to @{username}. Completion will be announced in this group.")
 
@@ -330,19 +578,18 @@ class TaskBot:
         # Track the user
         await self._track_user(update.effective_user)
         
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('''SELECT id, assignee_username, description, scheduled_time, frequency, is_done FROM tasks WHERE chat_id = ?''', (update.effective_chat.id,))
-        rows = c.fetchall()
-        conn.close()
+        rows = await self._conn.execute_fetchall(SQL_SELECT_CHAT_TASKS, (update.effective_chat.id,))
         if not rows:
             await update.message.reply_text("No tasks found.")
             return
-        msg = "Tasks:\n"
-        for row in rows:
-            status = "✅" if row[5] else "⏳"
-            msg += f"ID {row[0]}: @{row[1]} - {row[2]} at {row[3]} PST ({row[4]}) {status}\n"
-        await update.message.reply_text(msg)
+        # One template for every row, joined once (no quadratic += rebuild)
+        line = "ID {}: @{} - {} at {} PST ({}) {}\n".format
+        parts = ["Tasks:\n"]
+        parts.extend(
+            line(task_id, username, desc, sched_time, freq, "✅" if is_done else "⏳")
+            for task_id, username, desc, sched_time, freq, is_done in rows
+        )
+        await update.message.reply_text("".join(parts))
 
     async def removetask(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message or not update.effective_user:
@@ -363,256 +610,325 @@ class TaskBot:
         except ValueError:
             await update.message.reply_text("❌ Task ID must be a number.")
             return
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-        c.execute('DELETE FROM reminders WHERE task_id = ?', (task_id,))
-        conn.commit()
-        conn.close()
+        async with self._transaction() as db:
+            await db.execute(SQL_DELETE_TASK, (task_id,))
+            await db.execute(SQL_DELETE_REMINDERS, (task_id,))
+        self._cancel_task(context.job_queue, task_id)
+        self._cancel_follow_up(context.job_queue, task_id)
         await update.message.reply_text(f"✅ Task {task_id} removed.")
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         if not query:
             return
-        await query.answer()
-        
-        # Track the user responding
-        await self._track_user(query.from_user)
+        # Acknowledge the button press and track the user responding side by side
+        await asyncio.gather(query.answer(), self._track_user(query.from_user))
         
         data = query.data
-        if not data or not data.startswith("task_"):
-            return
-        parts = data.split('_')
-        if len(parts) < 3:
+        if not data:
             return
         try:
-            task_id = int(parts[1])
-            response = parts[2]
-        except (ValueError, IndexError):
+            parsed = parse_callback_data(data)
+        except ValueError:
             await query.edit_message_text("❌ Invalid response data.")
             return
+        if parsed is None:
+            return
+        task_id, response = parsed
         
+        # Look up the task and record the response in a single transaction
+        responding_user = query.from_user
+        async with self._transaction() as db:
+            reply, completed, remind_again = await self._record_response(db, task_id, response, responding_user)
+        if completed:
+            self._cancel_task(context.job_queue, task_id)
+            self._cancel_follow_up(context.job_queue, task_id)
+        elif remind_again:
+            self._schedule_follow_up(context.job_queue, task_id)
+        
+        # Updating the reminder and announcing in the group are independent calls
+        outgoing = []
+        if reply:
+            outgoing.append(query.edit_message_text(reply))
+        if completed:
+            outgoing.append(self._announce_completion(context, *completed))
+        await asyncio.gather(*outgoing)
+
+    async def _announce_completion(self, context, original_chat_id, assignee_username, task_description):
+        # Send completion message to the original group
+        try:
+            await context.bot.send_message(
+                chat_id=original_chat_id,
+                text=f"✅ **Task Completed**\n\n@{assignee_username} has completed: {task_description}"
+            )
+            logger.info(f"Sent completion notification to group {original_chat_id}")
+        except Exception as e:
+            logger.error(f"Failed to send completion message to group: {e}")
+
+    async def _record_response(self, db, task_id, response, responding_user):
+        """Validate a YES/NO response and apply it inside the caller's transaction.
+
+        Returns the text to show on the reminder message, for a completed task
+        the (chat_id, assignee_username, description) to announce, and whether
+        a follow-up reminder should be scheduled.
+        """
         # Get the task details to check if this user can respond
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('SELECT assignee_username, is_done, chat_id, description FROM tasks WHERE id = ?', (task_id,))
-        row = c.fetchone()
+        row = await self._fetchone(db, SQL_SELECT_TASK_FOR_RESPONSE, (task_id,))
         if not row:
-            await query.edit_message_text("❌ Task not found.")
-            conn.close()
-            return
+            return "❌ Task not found.", None, False
             
         assignee_username, is_done, original_chat_id, task_description = row
         
         # Check if task is already done
         if is_done:
-            await query.edit_message_text("✅ This task is already completed.")
-            conn.close()
-            return
+            return "✅ This task is already completed.", None, False
         
         # Check if the responding user matches the assigned username
-        responding_user = query.from_user
         if responding_user.username and responding_user.username.lower() != assignee_username.lower():
-            await query.edit_message_text(f"❌ This task is assigned to @{assignee_username}, not you.")
-            conn.close()
-            return
+            return f"❌ This task is assigned to @{assignee_username}, not you.", None, False
         
         # If user doesn't have a username but we still want to allow responses
         # (some users might not have usernames set)
         if not responding_user.username:
-            await query.edit_message_text(f"❌ Please set a Telegram username to respond to tasks. This task is for @{assignee_username}.")
-            conn.close()
-            return
+            return f"❌ Please set a Telegram username to respond to tasks. This task is for @{assignee_username}.", None, False
             
         if response == "yes":
-            c.execute('UPDATE tasks SET is_done = 1 WHERE id = ?', (task_id,))
-            c.execute('DELETE FROM reminders WHERE task_id = ?', (task_id,))
-            await query.edit_message_text("✅ Task marked as complete! You will not be reminded again.")
-            
-            # Send completion message to the original group
-            try:
-                await context.bot.send_message(
-                    chat_id=original_chat_id,
-                    text=f"✅ **Task Completed**\n\n@{assignee_username} has completed: {task_description}"
-                )
-                logger.info(f"Sent completion notification to group {original_chat_id}")
-            except Exception as e:
-                logger.error(f"Failed to send completion message to group: {e}")
-            
+            await db.execute(SQL_MARK_TASK_DONE, (task_id,))
+            await db.execute(SQL_DELETE_REMINDERS, (task_id,))
             logger.info(f"Task {task_id} marked as complete by @{responding_user.username}")
+            return "✅ Task marked as complete! You will not be reminded again.", (original_chat_id, assignee_username, task_description), False
         elif response == "no":
             # Increment reminder count and schedule next
-            c.execute('SELECT reminder_count FROM reminders WHERE task_id = ?', (task_id,))
-            row = c.fetchone()
-            if row:
-                count = row[0] + 1
-                c.execute('UPDATE reminders SET reminder_count = ?, last_reminder = ? WHERE task_id = ?', (count, get_utc_now(), task_id))
-            else:
-                count = 1
-                c.execute('INSERT INTO reminders (task_id, reminder_count, last_reminder) VALUES (?, ?, ?)', (task_id, count, get_utc_now()))
-            await query.edit_message_text("📝 Task not completed. I will remind you again in 2 minutes.")
+            now_ts = int(get_utc_now().timestamp())
+            count, = await self._fetchone(db, SQL_RECORD_REMINDER_RETURNING, (task_id, now_ts))
             logger.info(f"Task {task_id} marked as not done by @{responding_user.username}, will remind again")
-        conn.commit()
-        conn.close()
+            return "📝 Task not completed. I will remind you again in 2 minutes.", None, count < MAX_REMINDERS
+        return None, None, False
 
     async def send_reminders(self, context: ContextTypes.DEFAULT_TYPE):
+        """Scan every open task for ones at their time (/test forces a check this way)"""
+        # One clock read per sweep; both views and every stored timestamp share it
         utc_now = get_utc_now()
+        pst_now = utc_now.astimezone(PST)
+        now_ts = int(utc_now.timestamp())
+        logger.info("=== REMINDER CHECK START ===")
+        logger.debug("Current PST time: %s", pst_now)
+        logger.debug("Current UTC time: %s", utc_now)
+        
+        # Let SQLite pick the open tasks within 2 minutes of now (an idx_tasks_open
+        # range seek); this read needs no write lock, so idle sweeps never open a transaction
+        now_min = pst_now.hour * 60 + pst_now.minute
+        window = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in (max(now_min - 2, 0), min(now_min + 2, 24 * 60 - 1)))
+        candidates = await self._conn.execute_fetchall(SQL_SELECT_DUE_TASKS, window)
+        logger.info("Found %s tasks due between %s and %s PST", len(candidates), *window)
+        # Per-task detail is DEBUG only; don't even walk the rows at INFO
+        if logger.isEnabledFor(logging.DEBUG):
+            for task_id, _, _, username, description, sched_time, freq, _, _ in candidates:
+                logger.debug("✅ Task %s: @%s - %s at %s PST (%s)", task_id, username, description, sched_time, freq)
+
+        if not candidates:
+            logger.info("=== REMINDER CHECK END (nothing due) ===")
+            return
+
+        async with self._transaction() as db:
+            # Re-read the window with its reminder state under the write lock, so
+            # tasks closed or reminded since the check above are seen
+            candidates = await db.execute_fetchall(SQL_SELECT_DUE_TASKS, window)
+            # Reminder bookkeeping is collected and written in bulk after the loop;
+            # the Telegram sends are deferred until the transaction has committed
+            reminder_rows = []
+            due = []
+    
+            for task_id, chat_id, assignee_id, username, description, _, _, last_reminder, reminder_count in candidates:
+                try:
+                    new_count = self._next_reminder_count(last_reminder, reminder_count, now_ts)
+                    if new_count is None:
+                        continue
+                    # Update reminders table
+                    reminder_rows.append((task_id, now_ts))
+                    logger.debug("Recording reminder %s for task %s", new_count, task_id)
+                    due.append((task_id, chat_id, assignee_id, username, description, new_count))
+                except Exception as e:
+                    logger.error("Error processing task %s: %s", task_id, e)
+
+            if reminder_rows:
+                await db.executemany(SQL_RECORD_REMINDER, reminder_rows)
+            logger.info("Recorded %s reminders", len(reminder_rows))
+
+        logger.info("🚀 SENDING %s REMINDERS", len(due))
+        results = await asyncio.gather(
+            *(self._send_task_reminder(context, chat_id, assignee_id, username, description, task_id)
+              for task_id, chat_id, assignee_id, username, description, _ in due),
+            return_exceptions=True
+        )
+        for (task_id, _, _, _, _, new_count), result in zip(due, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to send reminder for task %s: %s", task_id, result)
+            if new_count < MAX_REMINDERS:
+                self._schedule_follow_up(context.job_queue, task_id)
+
+        logger.info("=== REMINDER CHECK END ===")
+
+    def _next_reminder_count(self, last_reminder, reminder_count, now_ts):
+        """Return the count the next reminder would have, or None if it must not be sent.
+
+        Takes the task's reminder row (both None when it has none yet) and refuses
+        once MAX_REMINDERS is reached or the last reminder was too recent.
+        """
+        if reminder_count is None:
+            logger.debug("No existing reminder record - first time")
+            return 1
+        
+        logger.debug("Existing reminder record: count=%s, last=%s", reminder_count, last_reminder)
+        if reminder_count >= MAX_REMINDERS:
+            logger.debug("❌ Not sending reminder: Max reminders reached (%s/%s)", reminder_count, MAX_REMINDERS)
+            return None
+        if last_reminder:
+            elapsed = now_ts - last_reminder
+            logger.debug("Seconds since last reminder: %s", elapsed)
+            if elapsed < REMINDER_INTERVAL:
+                logger.debug("❌ Not sending reminder: Too soon since last reminder (%ss < %ss)", elapsed, REMINDER_INTERVAL)
+                return None
+        return reminder_count + 1
+
+    def _schedule_task(self, job_queue, task_id, sched_time, pst_now=None):
+        """Arm the daily job that reminds about a task at its scheduled PST time"""
+        hour, minute = map(int, sched_time.split(':'))
+        self._cancel_task(job_queue, task_id)
+        # No misfire grace: APScheduler's 1s default would silently skip the day's
+        # reminder whenever the loop wakes late; a late reminder beats none
+        job_queue.run_daily(self._fire_task, time=dt_time(hour, minute, tzinfo=PST), data=task_id, name=f"task_{task_id}",
+                            job_kwargs={'misfire_grace_time': None})
+        # A time that passed within the last 2 minutes still counts as due
+        pst_now = pst_now or get_pst_now()
+        minutes_late = (pst_now.hour * 60 + pst_now.minute) - (hour * 60 + minute)
+        if 0 <= minutes_late <= 2:
+            # No misfire grace: at startup this is armed before the JobQueue runs, and
+            # APScheduler would otherwise drop it if startup takes over a second
+            job_queue.run_once(self._fire_task, when=0, data=task_id, name=f"task_{task_id}",
+                               job_kwargs={'misfire_grace_time': None})
+
+    def _cancel_task(self, job_queue, task_id):
+        for job in job_queue.get_jobs_by_name(f"task_{task_id}"):
+            job.schedule_removal()
+
+    async def _fire_task(self, context: ContextTypes.DEFAULT_TYPE):
+        """Send a task's reminder when its scheduled time comes round"""
+        task_id = context.job.data
+        now_ts = int(get_utc_now().timestamp())
+        logger.info("⏰ Task %s is due", task_id)
+        async with self._transaction() as db:
+            # Check if already reminded recently (using UTC for consistency)
+            row = await self._fetchone(db, SQL_SELECT_OPEN_REMINDER, (task_id,))
+            if not row:
+                logger.info("❌ Task %s was completed or removed", task_id)
+                return
+            chat_id, assignee_id, username, description, last_reminder, reminder_count = row
+            new_count = self._next_reminder_count(last_reminder, reminder_count, now_ts)
+            if new_count is None:
+                return
+            await db.execute(SQL_RECORD_REMINDER, (task_id, now_ts))
+        
+        logger.info("🚀 SENDING REMINDER for task %s", task_id)
+        await self._send_task_reminder(context, chat_id, assignee_id, username, description, task_id)
+        if new_count < MAX_REMINDERS:
+            self._schedule_follow_up(context.job_queue, task_id)
+
+    async def _restore_tasks(self, job_queue):
+        """Arm the daily reminder job for every open task"""
+        tasks = await self._conn.execute_fetchall(SQL_SELECT_ACTIVE_TASKS)
         pst_now = get_pst_now()
-        logger.info(f"=== REMINDER CHECK START ===")
-        logger.info(f"Current PST time: {pst_now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        logger.info(f"Current UTC time: {utc_now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        # Get all tasks that are not done
-        c.execute('''SELECT id, chat_id, assignee_id, assignee_username, description, scheduled_time, frequency FROM tasks WHERE is_done = 0''')
-        tasks = c.fetchall()
-        logger.info(f"Found {len(tasks)} active tasks")
-        
-        for task in tasks:
-            task_id, chat_id, assignee_id, username, description, sched_time, freq = task
-            logger.info(f"--- Checking Task {task_id} ---")
-            logger.info(f"Task: @{username} - {description}")
-            logger.info(f"Scheduled time: {sched_time} PST")
-            logger.info(f"Frequency: {freq}")
-            
-            # Check if it's time to remind (compare PST times)
-            current_pst_time = pst_now.strftime("%H:%M")
-            logger.info(f"Current PST time: {current_pst_time}")
-            
+        for task_id, _, _, _, _, sched_time, _ in tasks:
             try:
-                sched_hour, sched_min = map(int, sched_time.split(':'))
-                current_hour, current_min = pst_now.hour, pst_now.minute
-                
-                # Check if current time is within 2 minutes of scheduled time
-                time_diff = abs((current_hour * 60 + current_min) - (sched_hour * 60 + sched_min))
-                time_match = time_diff <= 2
-                
-                logger.info(f"Time difference: {time_diff} minutes")
-                logger.info(f"Time match (within 2 min): {time_match}")
-                
-                if time_match:
-                    logger.info(f"✅ Time matches for task {task_id}!")
-                    
-                    # Check if already reminded recently (using UTC for consistency)
-                    c.execute('SELECT last_reminder, reminder_count FROM reminders WHERE task_id = ?', (task_id,))
-                    row = c.fetchone()
-                    
-                    should_remind = True
-                    reason = ""
-                    
-                    if row:
-                        last_reminder, reminder_count = row
-                        logger.info(f"Existing reminder record: count={reminder_count}, last={last_reminder}")
-                        
-                        if reminder_count >= MAX_REMINDERS:
-                            should_remind = False
-                            reason = f"Max reminders reached ({reminder_count}/{MAX_REMINDERS})"
-                        elif last_reminder:
-                            try:
-                                last_dt = datetime.fromisoformat(last_reminder)
-                                if last_dt.tzinfo is None:
-                                    last_dt = UTC.localize(last_dt)
-                                seconds_since = (utc_now - last_dt).total_seconds()
-                                logger.info(f"Seconds since last reminder: {seconds_since}")
-                                if seconds_since < REMINDER_INTERVAL:
-                                    should_remind = False
-                                    reason = f"Too soon since last reminder ({seconds_since}s < {REMINDER_INTERVAL}s)"
-                            except ValueError as e:
-                                logger.error(f"Invalid date format: {last_reminder}, error: {e}")
-                    else:
-                        logger.info("No existing reminder record - first time")
-                    
-                    if should_remind:
-                        logger.info(f"🚀 SENDING REMINDER for task {task_id}")
-                        try:
-                            await self._send_task_reminder(context, chat_id, assignee_id, username, description, task_id)
-                            # Update reminders table
-                            if row:
-                                new_count = (reminder_count or 0) + 1
-                                c.execute('UPDATE reminders SET last_reminder = ?, reminder_count = ? WHERE task_id = ?', 
-                                        (utc_now, new_count, task_id))
-                                logger.info(f"Updated reminder count to {new_count}")
-                            else:
-                                c.execute('INSERT INTO reminders (task_id, reminder_count, last_reminder) VALUES (?, ?, ?)', 
-                                        (task_id, 1, utc_now))
-                                logger.info(f"Created new reminder record")
-                        except Exception as e:
-                            logger.error(f"Failed to send/record reminder: {e}")
-                    else:
-                        logger.info(f"❌ Not sending reminder: {reason}")
-                else:
-                    logger.info(f"❌ Time doesn't match for task {task_id}")
-                    
-            except Exception as e:
-                logger.error(f"Error processing task {task_id}: {e}")
-        
-        # Send follow-up reminders for tasks with NO or no response
-        logger.info(f"--- CHECKING FOLLOW-UP REMINDERS ---")
-        c.execute('''SELECT r.task_id, t.chat_id, t.assignee_id, t.assignee_username, t.description, r.reminder_count, r.last_reminder FROM reminders r JOIN tasks t ON r.task_id = t.id WHERE t.is_done = 0 AND r.reminder_count < ?''', (MAX_REMINDERS,))
-        follow_ups = c.fetchall()
-        logger.info(f"Found {len(follow_ups)} tasks needing follow-up reminders")
-        
-        for row in follow_ups:
-            task_id, chat_id, assignee_id, username, description, reminder_count, last_reminder = row
-            logger.info(f"Follow-up check for task {task_id}: count={reminder_count}, last={last_reminder}")
+                self._schedule_task(job_queue, task_id, sched_time, pst_now)
+            except ValueError as e:
+                logger.error("Invalid scheduled time for task %s: %s, error: %s", task_id, sched_time, e)
+        logger.info("Scheduled %s open tasks", len(tasks))
+
+    def _schedule_follow_up(self, job_queue, task_id, delay=REMINDER_INTERVAL):
+        """(Re)arm the single follow-up timer for a task"""
+        self._cancel_follow_up(job_queue, task_id)
+        # Restored follow-ups may be due at once, before the JobQueue has started;
+        # without this APScheduler drops them as missed
+        job_queue.run_once(self._fire_reminder, when=delay, data=task_id, name=f"reminder_{task_id}",
+                           job_kwargs={'misfire_grace_time': None})
+
+    def _cancel_follow_up(self, job_queue, task_id):
+        for job in job_queue.get_jobs_by_name(f"reminder_{task_id}"):
+            job.schedule_removal()
+
+    async def _fire_reminder(self, context: ContextTypes.DEFAULT_TYPE):
+        """Send a follow-up reminder for a task that got NO or no response"""
+        task_id = context.job.data
+        now_ts = int(get_utc_now().timestamp())
+        async with self._transaction() as db:
+            row = await self._fetchone(db, SQL_SELECT_FOLLOW_UP, (task_id, MAX_REMINDERS))
+            if not row:
+                logger.info("No follow-up needed for task %s", task_id)
+                return
+            chat_id, assignee_id, username, description, reminder_count, last_reminder = row
             
             if last_reminder:
-                try:
-                    last_dt = datetime.fromisoformat(last_reminder)
-                    if last_dt.tzinfo is None:
-                        last_dt = UTC.localize(last_dt)
-                    seconds_since = (utc_now - last_dt).total_seconds()
-                    logger.info(f"Seconds since last follow-up: {seconds_since}")
-                    
-                    if seconds_since >= REMINDER_INTERVAL:
-                        logger.info(f"🚀 SENDING FOLLOW-UP reminder for task {task_id}")
-                        await self._send_task_reminder(context, chat_id, assignee_id, username, description, task_id)
-                        c.execute('UPDATE reminders SET last_reminder = ?, reminder_count = ? WHERE task_id = ?', 
-                                (utc_now, reminder_count + 1, task_id))
-                    else:
-                        logger.info(f"❌ Too soon for follow-up ({seconds_since}s < {REMINDER_INTERVAL}s)")
-                except ValueError as e:
-                    logger.error(f"Invalid date format for task {task_id}: {last_reminder}, error: {e}")
-        
-        conn.commit()
-        conn.close()
-        logger.info(f"=== REMINDER CHECK END ===")
+                elapsed = now_ts - last_reminder
+                if elapsed < REMINDER_INTERVAL:
+                    # Someone reminded or answered NO in the meantime; wait out the rest
+                    logger.info("❌ Too soon for follow-up (%ss < %ss)", elapsed, REMINDER_INTERVAL)
+                    self._schedule_follow_up(context.job_queue, task_id, REMINDER_INTERVAL - elapsed)
+                    return
+            
+            await db.execute(SQL_RECORD_REMINDER, (task_id, now_ts))
+    
+        logger.info("🚀 SENDING FOLLOW-UP reminder for task %s", task_id)
+        await self._send_task_reminder(context, chat_id, assignee_id, username, description, task_id)
+        if reminder_count + 1 < MAX_REMINDERS:
+            self._schedule_follow_up(context.job_queue, task_id)
+
+    async def _restore_follow_ups(self, job_queue):
+        """Re-arm follow-up timers for reminders that were pending at shutdown"""
+        now_ts = int(get_utc_now().timestamp())
+        follow_ups = await self._conn.execute_fetchall(SQL_SELECT_FOLLOW_UPS, (MAX_REMINDERS,))
+        for task_id, _, _, _, _, _, last_reminder in follow_ups:
+            delay = max(0, REMINDER_INTERVAL - (now_ts - last_reminder)) if last_reminder else 0
+            self._schedule_follow_up(job_queue, task_id, delay)
+        logger.info("Restored %s follow-up reminders", len(follow_ups))
 
     async def _track_user(self, user):
         """Track user information for private messaging"""
         if not user or not user.username:
             return
         
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('''
-            INSERT OR REPLACE INTO users (id, username, first_name, last_name, last_seen)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user.id, user.username.lower(), user.first_name, user.last_name, get_utc_now()))
-        conn.commit()
-        conn.close()
-        logger.debug(f"Tracked user @{user.username} (ID: {user.id})")
+        username = user.username.lower()
+        now = monotonic()
+        seen = self._tracked.get(user.id)
+        # Skip the write for a user we just recorded with the same details
+        if seen and seen[:3] == (username, user.first_name, user.last_name) and now - seen[3] < USER_TRACK_INTERVAL:
+            return
+        async with self._db_lock:
+            await self._conn.execute(SQL_UPSERT_USER, (user.id, username, user.first_name, user.last_name, int(get_utc_now().timestamp())))
+        self._tracked[user.id] = (username, user.first_name, user.last_name, now)
+        self._cache_user_id(username, user.id)
+        logger.debug("Tracked user @%s (ID: %s)", user.username, user.id)
+
+    def _cache_user_id(self, username, user_id):
+        old = self._usernames.get(user_id)
+        if old is not None and old != username:
+            self._user_ids.pop(old, None)
+        self._usernames[user_id] = username
+        self._user_ids[username] = user_id
 
     async def _get_user_id_by_username(self, username):
-        """Get user ID by username from our database"""
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('SELECT id FROM users WHERE username = ?', (username.lower(),))
-        row = c.fetchone()
-        conn.close()
-        return row[0] if row else None
+        """Get user ID by username, from the cache or else our database"""
+        username = username.lower()
+        user_id = self._user_ids.get(username)
+        if user_id is None:
+            row = await self._fetchone(self._conn, SQL_SELECT_USER_ID, (username,))
+            if row:
+                user_id = row[0]
+                self._cache_user_id(username, user_id)
+        return user_id
 
     async def _send_task_reminder(self, context, chat_id, assignee_id, username, description, task_id):
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ YES", callback_data=f"task_{task_id}_yes"),
-                InlineKeyboardButton("❌ NO", callback_data=f"task_{task_id}_no")
-            ]
-        ]
-        markup = InlineKeyboardMarkup(keyboard)
+        markup = reminder_markup(task_id)
         
         # Try to get user ID from our database
         user_id_to_dm = await self._get_user_id_by_username(username)
@@ -623,13 +939,13 @@ class TaskBot:
             try:
                 await context.bot.send_message(
                     chat_id=user_id_to_dm,
-                    text=f"⏰ **Task Reminder**\n\nYou have a task due: {description}\n\nHave you completed it?",
+                    text=REMINDER_TEXT.format(description=description),
                     reply_markup=markup
                 )
-                logger.info(f"Successfully sent private reminder for task {task_id} to @{username}")
+                logger.info("Successfully sent private reminder for task %s to @%s", task_id, username)
                 reminder_sent_privately = True
             except Exception as e:
-                logger.warning(f"Failed to send private message to @{username}: {e}")
+                logger.warning("Failed to send private message to @%s: %s", username, e)
         
         # If private message failed or user ID not found, send to group with a note
         if not reminder_sent_privately:
@@ -637,12 +953,12 @@ class TaskBot:
                 bot_username = context.bot.username if hasattr(context.bot, 'username') else "this bot"
                 await context.bot.send_message(
                     chat_id=chat_id,
-                    text=f"⏰ **Private Task Reminder**\n\n@{username}, you have a task due: {description}\n\nHave you completed it?\n\n💡 *I tried to send this privately, but couldn't reach you. Please start a chat with @{bot_username} to receive private reminders.*",
+                    text=GROUP_REMINDER_TEXT.format(username=username, description=description, bot_username=bot_username),
                     reply_markup=markup
                 )
-                logger.info(f"Sent group reminder for task {task_id} to @{username} (private message failed)")
+                logger.info("Sent group reminder for task %s to @%s (private message failed)", task_id, username)
             except Exception as e:
-                logger.error(f"Failed to send reminder for task {task_id}: {e}")
+                logger.error("Failed to send reminder for task %s: %s", task_id, e)
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message:
@@ -651,52 +967,19 @@ class TaskBot:
         # Track the user
         await self._track_user(update.effective_user)
         
-        help_text = """📋 **Task Management Bot Help**
-
-**📝 Creating Tasks:**
-• `/createtask @username description time frequency`
-• Example: `/createtask @john Clean office 09:00 daily`
-• Example: `/createtask @jane Submit report 17:30 once`
-
-**⏰ Time & Frequency:**
-• Time format: 24-hour PST (09:00, 17:30, 23:45)
-• Frequency: `once` (one-time) or `daily` (repeats daily)
-• All times are in Pacific Time (PST/PDT)
-
-**📋 Managing Tasks:**
-• `/tasks` - View all active tasks with their IDs
-• `/removetask 5` - Remove task with ID 5
-• `/time` - Show current PST time
-
-**🔔 Task Responses:**
-When you get a task reminder:
-• ✅ **YES** - Task completed (stops all reminders)
-• ❌ **NO** - Task not completed (reminds again in 2 minutes)
-
-**👥 How Reminders Work:**
-• **Private reminders** sent to you via DM
-• **Group announcements** when tasks are completed
-• Automatic follow-ups every 2 minutes until completed
-• Maximum 30 reminders per task
-
-**🔧 Admin Commands:**
-• `/debug` - Show system status and tracked users
-• `/test` - Manually trigger reminder system
-• `/testtask @username` - Create test task for immediate testing
-
-**💡 Tips:**
-• Start a private chat with the bot to receive DM reminders
-• Only assigned users can respond to their tasks
-• Task completions are announced in the group
-• Use `/time` to see current PST time for scheduling
-
-**🆘 Need Help?**
-Contact your group administrators for task management assistance."""
-        
-        await update.message.reply_text(help_text, parse_mode='Markdown')
+        await update.message.reply_text(HELP_TEXT, parse_mode='Markdown')
 
     def run(self):
-        self.application = Application.builder().token(self.token).build()
+        self.application = (
+            Application.builder()
+            .token(self.token)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+            # Paces every Bot API call to Telegram's 30/s overall and 20/min per group
+            # limits, so reminder bursts queue briefly instead of failing with 429s
+            .rate_limiter(AIORateLimiter(max_retries=MAX_SEND_RETRIES))
+            .build()
+        )
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler("help", self.help_command))
         self.application.add_handler(CommandHandler("createtask", self.createtask))
@@ -707,16 +990,29 @@ Contact your group administrators for task management assistance."""
         self.application.add_handler(CommandHandler("testtask", self.testtask))
         self.application.add_handler(CommandHandler("time", self.time))
         self.application.add_handler(CallbackQueryHandler(self.handle_callback))
-        # Run reminders every 2 minutes
-        self.application.job_queue.run_repeating(self.send_reminders, interval=REMINDER_INTERVAL, first=5)
         logger.info("Bot started.")
-        self.application.run_polling()
+        webhook_url = os.getenv('WEBHOOK_URL')
+        if webhook_url:
+            # Telegram pushes each update to us instead of the bot long-polling getUpdates;
+            # the token in the path keeps the endpoint unguessable
+            self.application.run_webhook(
+                listen='0.0.0.0',
+                port=int(os.getenv('PORT', '8443')),
+                url_path=self.token,
+                webhook_url=f"{webhook_url.rstrip('/')}/{self.token}",
+                # Telegram echoes this in a header on every push; requests without it are rejected
+                secret_token=os.getenv('WEBHOOK_SECRET'),
+            )
+        else:
+            self.application.run_polling()
 
 # --- MAIN ---
+# Comma-separated numeric IDs; malformed entries are skipped
+ADMIN_IDS_RE = re.compile(r'(?:^|,)\s*(\d+)\s*(?=,|$)', re.ASCII)
+
 def main():
     BOT_TOKEN = os.getenv('BOT_TOKEN', 'PASTE_YOUR_BOT_TOKEN_HERE')
-    ADMIN_IDS = os.getenv('ADMIN_IDS', '123456789').split(',')
-    ADMIN_IDS = [int(x.strip()) for x in ADMIN_IDS if x.strip().isdigit()]
+    ADMIN_IDS = list(map(int, ADMIN_IDS_RE.findall(os.getenv('ADMIN_IDS', '123456789'))))
     if BOT_TOKEN == 'PASTE_YOUR_BOT_TOKEN_HERE':
         print("Please set your BOT_TOKEN in the environment or in the code.")
         return